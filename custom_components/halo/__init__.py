@@ -1,16 +1,19 @@
 """The halo component."""
+import asyncio
 import logging
+import httpx
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 from homeassistant.const import (
     CONF_PASSWORD,
     CONF_USERNAME,
 )
-from .const import DATA_HALO_CONFIG, DOMAIN, PLATFORMS
-from .halo import HaloApi
+from .const import DATA_API, DATA_HALO_CONFIG, DATA_LIGHTS, DATA_SCENES, DOMAIN, PLATFORMS
+from .halo import HaloApi, HaloAuthenticationError, HaloException
 
 CONFIG = vol.Schema({ 
     DOMAIN: vol.Schema({
@@ -40,9 +43,32 @@ async def async_setup(hass: HomeAssistant, config: ConfigType):
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     api = HaloApi(entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD])
-    await api.async_authenticate()
+    try:
+        await api.async_authenticate()
 
-    hass.data[DOMAIN] = api
+        # Enumerate every location's devices, groups and scenes concurrently.
+        locations = await api.async_get_locations()
+        location_ids = [location['pid'] for location in locations]
+        results = await asyncio.gather(
+            *(api.async_get_devices(location_id) for location_id in location_ids),
+            *(api.async_get_groups(location_id) for location_id in location_ids),
+            *(api.async_get_scenes(location_id) for location_id in location_ids),
+        )
+    except HaloAuthenticationError as err:
+        # Wrong credentials will not fix themselves, so do not keep retrying the login.
+        await api.async_close()
+        raise ConfigEntryAuthFailed from err
+    except (HaloException, httpx.HTTPError) as err:
+        await api.async_close()
+        raise ConfigEntryNotReady from err
+
+    lights_end = 2 * len(location_ids)
+
+    hass.data[DOMAIN] = {
+        DATA_API: api,
+        DATA_LIGHTS: [light for batch in results[:lights_end] for light in batch],
+        DATA_SCENES: [scene for batch in results[lights_end:] for scene in batch],
+    }
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
@@ -51,5 +77,5 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload the config entry and platforms."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data.pop(DOMAIN)
+        await hass.data.pop(DOMAIN)[DATA_API].async_close()
     return unload_ok
@@ -2,6 +2,9 @@ from homeassistant.const import Platform
 
 DOMAIN="halo"
 DATA_HALO_CONFIG = "halo_config"
+DATA_API = "api"
+DATA_LIGHTS = "lights"
+DATA_SCENES = "scenes"
 PLATFORMS = [
     Platform.SWITCH,
     Platform.LIGHT,
@@ -3,47 +3,116 @@ Python module for control of Halo bluetooth dimmers
 This code is released under the terms of the GPLv3 license. See the
 LICENSE file for more details.
 """
-import json
+import asyncio
+import functools
 import logging
-import requests
+import orjson
 import httpx
+import random
 import time
 
 REFRESH_CACHE_TTL_SECONDS = 15
+STATE_CACHE_MAX_ENTRIES = 1000
+# State entries whose 'value' is a JSON list, decoded once per state update.
+PARSED_STATE_NAMES = ('on_off', 'dim')
 API_TIMEOUT = 10
+MAX_CONCURRENT_REQUESTS = 10
+API_RETRIES = 2
+API_RETRY_BACKOFF_SECONDS = 0.1
+# product_id of the HLB6 downlights among a location's abstract devices.
+HALO_PRODUCT_ID = 162
+JSON_HEADERS = {'Content-Type': 'application/json'}
 _LOGGER = logging.getLogger(__name__)
+_monotonic = time.monotonic
+
+
+def _render_state_body(name, value):
+    """Render the {'state': {'name': name, 'value': value}} POST body."""
+    return b'{"state":{"name":%s,"value":%s}}' % (orjson.dumps(name), orjson.dumps(value))
+
+
+# on/off is the most frequent command, so its bodies are rendered once at import.
+_STATE_BODIES = {
+    ('on_off', '[1]'): _render_state_body('on_off', '[1]'),
+    ('on_off', '[0]'): _render_state_body('on_off', '[0]'),
+}
+
+
+def _index_states(states):
+    """Key a list of {'name': ..., 'value': ...} state entries by name."""
+    return {state['name']: state for state in states}
+
+
+def _state_body(name, value):
+    body = _STATE_BODIES.get((name, value))
+    if body is None:
+        body = _render_state_body(name, value)
+    return body
+
+
+class HaloException(Exception):
+    """Raised when the Halo API cannot be used, e.g. authentication failed."""
+
+
+class HaloAuthenticationError(HaloException):
+    """Raised when the API rejects the configured credentials."""
+
 
 class HaloDevice:
+    __slots__ = ('_state', '_parsed', '_on', '_api', '_pid', '_name', '_is_group',
+            '_last_updated')
+
     def __init__(self, api, name, pid, is_group = False):
         self._state = {}
+        self._parsed = {}
+        self._on = None
         self._api = api
         self._pid = pid
         self._name = name
         self._is_group = is_group
         self._last_updated = None
 
+    def _set_state(self, states):
+        """Store the name-indexed state returned by the API and decode its values."""
+        self._state = states or {}
+        self._parsed = {name: orjson.loads(self._state[name]['value'])
+                for name in PARSED_STATE_NAMES if name in self._state}
+        _value = self._parsed.get('on_off')
+        self._on = None if _value is None else bool(_value[0])
+
+    def _store_write(self, states):
+        # Like a failed poll, a failed write keeps the last known state.
+        if states is not None:
+            self._set_state(states)
+            self._last_updated = _monotonic()
+
     async def async_refresh(self):
+        # State from a refresh or write within the TTL is still current.
+        now = _monotonic()
+        if self._last_updated and now - self._last_updated < REFRESH_CACHE_TTL_SECONDS:
+            return
+
         if self._is_group:
-            self._state = await self._api.async_get_group_state(self._pid)
-            _LOGGER.warn(self._state)
+            states = await self._api.async_get_group_state(self._pid)
+            _LOGGER.debug("group %s state: %s", self._pid, states)
         else:
-            self._state = await self._api.async_get_device_state(self._pid)
+            states = await self._api.async_get_device_state(self._pid)
+        # A failed poll returns None: keep the last known state and retry next update.
+        if states is not None:
+            self._set_state(states)
+            self._last_updated = now
 
     async def async_turn_on(self):
-        await self._api.async_turn_on(self._pid, self._is_group)
-        self._last_updated = time.time()
+        self._store_write(await self._api.async_turn_on(self._pid, self._is_group))
 
     async def async_turn_off(self):
-        await self._api.async_turn_off(self._pid, self._is_group)
-        self._last_updated = time.time()
+        self._store_write(await self._api.async_turn_off(self._pid, self._is_group))
 
     async def async_set_brightness(self, value):
-        self._state = await self._api.async_set_brightness(self._pid, value, self._is_group)
-        self._last_updated = time.time()
+        self._store_write(await self._api.async_set_brightness(self._pid, value, self._is_group))
 
     async def async_set_color_temp(self, value):
-        self._state = await self._api.async_set_color_temp(self._pid, value, self._is_group)
-        self._last_updated = time.time()
+        self._store_write(await self._api.async_set_color_temp(self._pid, value, self._is_group))
 
     @property
     def pid(self):
@@ -59,15 +128,16 @@ class HaloDevice:
 
     @property
     def brightness(self):
-        if not self._is_on():
+        if not self._state:
+            return None
+        if not self._on:
             return 0
 
-        _state_obj = self._state_brightness()
-        if _state_obj is None:
+        _value = self._parsed.get('dim')
+        if _value is None:
             return None
 
-        _brightness = json.loads(_state_obj['value'])[0]
-        return _brightness or 255
+        return _value[0] or 255
 
     @property
     def color_temp(self):
@@ -77,27 +147,22 @@ class HaloDevice:
         return int(_state_obj['humanized'])
 
     def _is_on(self):
-        _state_obj = self._state_on_off()
-        if _state_obj is None:
-            return None
-        return bool(json.loads(_state_obj['value'])[0])
-
-    def _state_on_off(self):
-        return next((x for x in self._state if x['name'] == 'on_off'), None)
-
-    def _state_brightness(self):
-        return next((x for x in self._state if x['name'] == 'dim'), None)
+        return self._on
 
     def _state_color_temp(self):
-        return next((x for x in self._state if x['name'] == 'white'), None)
+        return self._state.get('white')
 
 
 class HaloGroup(HaloDevice):
+    __slots__ = ()
+
     def __init__(self, api, name, pid):
         super().__init__(api, name, pid)
         self._is_group = True
 
 class HaloScene:
+    __slots__ = ('_state', '_api', '_pid', '_location_id', '_name', '_last_updated')
+
     def __init__(self, api, name, pid, location_id):
         self._state = None
         self._api = api
@@ -122,138 +187,204 @@ class HaloScene:
         await self._api.async_set_scene_state(self._pid, 'action', 'on')
 
     async def async_turn_off(self):
-        await self._api.async_set_scene_state(self._pid, 'action', 'on')
- 
+        if self._is_on() is False:
+            return
+        await self._api.async_set_scene_state(self._pid, 'action', 'off')
+
     async def async_refresh(self):
-        self._state = await self._api.async_get_scene_state(self._pid, self._location_id)
+        states = await self._api.async_get_scene_state(self._pid, self._location_id)
+        if states is not None:
+            self._state = states
 
     def _state_on_off(self):
-        return next((x for x in self._state if x['name'] == 'action'), None)
+        return (self._state or {}).get('action')
 
     def _is_on(self):
         _state_obj = self._state_on_off()
         if _state_obj is None:
             return None
-        return bool(json.loads(_state_obj['value'])[0])
+        return bool(orjson.loads(_state_obj['value'])[0])
 
 
 class HaloApi:
     API_URL = "https://api.avi-on.com/{api}"
     API_AUTH = API_URL.format(api='sessions')
     API_LOCATION = API_URL.format(api='user/locations')
-    API_GROUPS = API_URL.format(api='locations/{location}/groups')
-    API_DEVICES = API_URL.format(api='locations/{location}/abstract_devices')
-    API_SCENES = API_URL.format(api='locations/{location}/scenes')
-    API_DEVICE_STATE = API_URL.format(api='devices/{pid}/state')
-    API_GROUP_STATE = API_URL.format(api='groups/{pid}/state')
-    API_SCENE_STATE = API_URL.format(api='scenes/{pid}/state')
+    API_GROUPS = API_URL.format(api='locations/{}/groups')
+    API_DEVICES = API_URL.format(api='locations/{}/abstract_devices')
+    API_SCENES = API_URL.format(api='locations/{}/scenes')
+    API_DEVICE_STATE = API_URL.format(api='devices/{}/state')
+    API_GROUP_STATE = API_URL.format(api='groups/{}/state')
+    API_SCENE_STATE = API_URL.format(api='scenes/{}/state')
 
     def __init__(self, username: str, password: str):
         self.username = username
         self.password = password
+        self._client = None
+        self._auth_token = None
+        self._auth_generation = 0
+        self._auth_lock = asyncio.Lock()
+        self._credentials_rejected = False
+        self._headers = {}
+        self._state_cache = {}
+        self._inflight = {}
+        self._sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._urls = {}
+
+    def _set_auth_token(self, auth_token):
+        """Store the token and the Authorization header sent with every request."""
+        self._auth_token = auth_token
+        self._auth_generation += 1
+        self._headers = {'Authorization': f'Token {auth_token}'}
+        if self._client is not None:
+            self._client.headers.update(self._headers)
+
+    def _url(self, template, key):
+        """Format a positional URL template, memoized per template and key."""
+        url = self._urls.get((template, key))
+        if url is None:
+            url = self._urls[template, key] = template.format(key)
+        return url
+
+    def _cache_get(self, key):
+        """Return a cached response if it is younger than the refresh TTL."""
+        entry = self._state_cache.get(key)
+        if entry and _monotonic() - entry[0] < REFRESH_CACHE_TTL_SECONDS:
+            return entry[1]
+        return None
+
+    def _cache_set(self, key, value):
+        self._state_cache.pop(key, None)
+        if len(self._state_cache) >= STATE_CACHE_MAX_ENTRIES:
+            self._state_cache.pop(next(iter(self._state_cache)))
+        self._state_cache[key] = (_monotonic(), value)
+
+    def _cache_invalidate(self, key):
+        self._state_cache.pop(key, None)
+
+    async def _async_request(self, method, url, reauth=True, **kwargs):
+        """Send a request, re-authenticating and retrying once if the token is rejected.
+
+        Any response that is still not 2xx raises httpx.HTTPStatusError.
+        """
+        generation = self._auth_generation
+        r = await self._async_send(method, url, **kwargs)
+        if r.status_code == 401 and reauth:
+            _LOGGER.info("Halo API token rejected, re-authenticating")
+            await self._async_reauthenticate(generation)
+            r = await self._async_send(method, url, **kwargs)
+        r.raise_for_status()
+        return r
+
+    async def _async_reauthenticate(self, generation):
+        # Concurrent 401s share one login: only the first still sees the stale generation.
+        async with self._auth_lock:
+            # Retrying known-bad credentials on every poll risks locking the account.
+            if self._credentials_rejected:
+                raise HaloAuthenticationError('API credentials were rejected')
+            if self._auth_generation == generation:
+                await self.async_authenticate()
+
+    async def _async_send(self, method, url, **kwargs):
+        """Send a request on the shared client, capped at MAX_CONCURRENT_REQUESTS.
+
+        Read timeouts are retried with jittered exponential backoff, then re-raised.
+        """
+        for attempt in range(API_RETRIES):
+            try:
+                async with self._sem:
+                    return await self._client.request(method, url, **kwargs)
+            except httpx.ReadTimeout:
+                if attempt == API_RETRIES - 1:
+                    raise
+                delay = API_RETRY_BACKOFF_SECONDS * 2 ** attempt
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def _async_get_cached(self, key, fetch):
+        """Serve key from the cache, or share a single in-flight fetch between callers."""
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            # The fetch runs as its own task so cancelling any caller, including the
+            # one that started it, leaves it running for the others.
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._fetch_done, key, _monotonic()))
+        return await asyncio.shield(task)
+
+    def _fetch_done(self, key, started, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Calling exception() also marks it retrieved when every caller was cancelled.
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        # A write that landed while this fetch was in flight has newer state.
+        result = task.result()
+        entry = self._state_cache.get(key)
+        if result is not None and (entry is None or entry[0] < started):
+            self._cache_set(key, result)
 
-    def authenticate(self):
+    async def async_authenticate(self):
         """Authenticate with the API and get a token."""
         auth_data = {'email': self.username, 'password': self.password}
-        r = requests.post(self.API_AUTH, json=auth_data, timeout=API_TIMEOUT)
-        self._auth_token = r.json()['credentials']['auth_token']
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                    http2=True,
+                    headers=self._headers,
+                    timeout=API_TIMEOUT,
+                    limits=httpx.Limits(max_keepalive_connections=20, max_connections=20))
+
         try:
-            return self._auth_token
-        except KeyError:
+            r = await self._async_request('POST', self.API_AUTH, reauth=False,
+                    content=orjson.dumps(auth_data), headers=JSON_HEADERS)
+        except (httpx.ReadTimeout):
+            _LOGGER.error("Failed to authenticate: Timeout")
             raise(HaloException('API authentication failed'))
+        except httpx.HTTPStatusError as err:
+            _LOGGER.error("Failed to authenticate: %s", err)
+            status = err.response.status_code
+            if 400 <= status < 500 and status != 429:
+                self._credentials_rejected = True
+                raise(HaloAuthenticationError('API credentials were rejected')) from err
+            raise(HaloException('API authentication failed')) from err
+        except httpx.HTTPError as err:
+            _LOGGER.error("Failed to authenticate: %s", err)
+            raise(HaloException('API authentication failed')) from err
 
-    def get_locations(self):
+        try:
+            self._set_auth_token(orjson.loads(r.content)['credentials']['auth_token'])
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            _LOGGER.error("Failed to authenticate: HTTP %s", r.status_code)
+            self._credentials_rejected = True
+            raise(HaloAuthenticationError('API credentials were rejected'))
+        self._credentials_rejected = False
+        return self._auth_token
+
+    async def async_get_locations(self):
         """Get a list of locations from the API."""
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        r = requests.get(self.API_LOCATION, headers=headers, timeout=API_TIMEOUT)
-        return r.json()['locations']
+        r = await self._async_request('GET', self.API_LOCATION)
+        return orjson.loads(r.content)['locations']
 
-    def get_groups(self, location_id):
+    async def async_get_groups(self, location_id):
         """Get a list of groups for a particular location."""
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        r = requests.get(self.API_GROUPS.format(location=location_id),
-                headers=headers, timeout=API_TIMEOUT)
-        return list(map(lambda g: HaloGroup(self, g['name'], g['pid']), r.json()['groups']))
+        r = await self._async_request('GET', self._url(self.API_GROUPS, location_id))
+        return [HaloGroup(self, g['name'], g['pid']) for g in orjson.loads(r.content)['groups']]
 
-    def get_devices(self, location_id):
+    async def async_get_devices(self, location_id):
         """Get a list of devices for a particular location."""
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        r = requests.get(self.API_DEVICES.format(location=location_id),
-                headers=headers, timeout=API_TIMEOUT)
-        return list(map(lambda d: HaloDevice(self, d['name'], d['pid']), [d for d in r.json()['abstract_devices'] if d['product_id'] == 162]))
+        r = await self._async_request('GET', self._url(self.API_DEVICES, location_id))
+        return [HaloDevice(self, d['name'], d['pid'])
+                for d in orjson.loads(r.content)['abstract_devices'] if d['product_id'] == HALO_PRODUCT_ID]
 
-    def get_scenes(self, location_id):
+    async def async_get_scenes(self, location_id):
         """Get a list of scenes for a particular location."""
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        r = requests.get(self.API_SCENES.format(location=location_id),
-                headers=headers, timeout=API_TIMEOUT)
-        return list(map(lambda g: HaloScene(self, g['name'], g['pid'], location_id), r.json()['scenes']))
-
-    def turn_on(self, pid, is_group = False):
-        """Turns on a device or group"""
-        if is_group:
-            return self.set_group_state(pid, 'on_off', '[1]')
-        return self.set_device_state(pid, 'on_off', '[1]')
-
-    def turn_off(self, pid, is_group = False):
-        """Turns off a device or group"""
-        if is_group:
-            return self.set_group_state(pid, 'on_off', '[0]')
-        return self.set_device_state(pid, 'on_off', '[0]')
-
-    def set_brightness(self, pid, value, is_group = False):
-        """Dim a device or group"""
-        if is_group:
-            return self.set_group_state(pid, 'dim', '[{}]'.format(value))
-        return self.set_device_state(pid, 'dim', '[{}]'.format(value))
-
-    def set_color_temp(self, pid, k, is_group = False):
-        if is_group:
-            return self.set_group_state(pid, 'white', k)
-        return self.set_device_state(pid, 'white', k)
-
-    def set_group_state(self, pid, name, value):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        data =  { 'state' : {'name': name, 'value': value}}
-
-        r = requests.post(self.API_GROUP_STATE.format(pid=pid),
-                headers=headers,
-                json=data,
-                timeout=API_TIMEOUT)
-        return r.json()['states']
-
-    def set_device_state(self, pid, name, value):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        data =  { 'state' : {'name': name, 'value': value}}
-
-        r = requests.post(self.API_DEVICE_STATE.format(pid=pid),
-                headers=headers,
-                json=data,
-                timeout=API_TIMEOUT)
-        return r.json()['states']
-
-    def set_scene_state(self, pid, name, value):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        data =  { 'state' : {'name': name, 'value': value}}
-
-        r = requests.post(self.API_SCENE_STATE.format(pid=pid),
-                headers=headers,
-                json=data,
-                timeout=API_TIMEOUT)
-        return r.json()['states']
-
-    async def async_authenticate(self):
-        """Authenticate with the API and get a token."""
-        auth_data = {'email': self.username, 'password': self.password}
-
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(self.API_AUTH, json=auth_data, timeout=API_TIMEOUT)
-                self._auth_token = r.json()['credentials']['auth_token']
-                return self._auth_token
-        except (httpx.ReadTimeout):
-            _LOGGER.error("Failed to authenticate: Timeout")
-            raise(HaloException('API authentication failed'))
+        r = await self._async_request('GET', self._url(self.API_SCENES, location_id))
+        return [HaloScene(self, s['name'], s['pid'], location_id) for s in orjson.loads(r.content)['scenes']]
 
     async def async_turn_on(self, pid, is_group = False):
         """Turns on a device or group"""
@@ -279,77 +410,97 @@ class HaloApi:
         return await self.async_set_device_state(pid, 'white', k)
 
     async def async_set_group_state(self, pid, name, value):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        data =  { 'state' : {'name': name, 'value': value}}
-
+        key = ('group', pid)
+        self._cache_invalidate(key)
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(self.API_GROUP_STATE.format(pid=pid),
-                        headers=headers,
-                        json=data,
-                        timeout=API_TIMEOUT)
-                return r.json()['states']
+            r = await self._async_request('POST', self._url(self.API_GROUP_STATE, pid),
+                    content=_state_body(name, value), headers=JSON_HEADERS)
+            states = _index_states(orjson.loads(r.content)['states'])
         except (httpx.ReadTimeout):
             _LOGGER.error("Failed to set group state due to timeout")
+            return None
+        except (httpx.HTTPError, HaloException) as err:
+            _LOGGER.error("Failed to set group state: %s", err)
+            return None
 
-    async def async_set_device_state(self, pid, name, value):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        data =  { 'state' : {'name': name, 'value': value}}
+        # Cache the post-write state so a concurrent poll cannot store the old one.
+        self._cache_set(key, states)
+        return states
 
+    async def async_set_device_state(self, pid, name, value):
+        key = ('device', pid)
+        self._cache_invalidate(key)
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(self.API_DEVICE_STATE.format(pid=pid),
-                        headers=headers,
-                        json=data,
-                        timeout=API_TIMEOUT)
-                return r.json()['states']
+            r = await self._async_request('POST', self._url(self.API_DEVICE_STATE, pid),
+                    content=_state_body(name, value), headers=JSON_HEADERS)
+            states = _index_states(orjson.loads(r.content)['states'])
         except (httpx.ReadTimeout):
             _LOGGER.error("Failed to set device state due to timeout")
+            return None
+        except (httpx.HTTPError, HaloException) as err:
+            _LOGGER.error("Failed to set device state: %s", err)
+            return None
 
-    async def async_set_scene_state(self, pid, name, value):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        data =  { 'state' : {'name': name, 'value': value}}
+        # Cache the post-write state so a concurrent poll cannot store the old one.
+        self._cache_set(key, states)
+        return states
 
+    async def async_set_scene_state(self, pid, name, value):
+        for key in [key for key in self._state_cache if key[0] == 'scenes']:
+            self._cache_invalidate(key)
         try:
-            async with httpx.AsyncClient() as client:
-                r = await client.post(self.API_SCENE_STATE.format(pid=pid),
-                        headers=headers,
-                        json=data,
-                        timeout=API_TIMEOUT)
-                return r.json()['states']
+            r = await self._async_request('POST', self._url(self.API_SCENE_STATE, pid),
+                    content=_state_body(name, value), headers=JSON_HEADERS)
+            return _index_states(orjson.loads(r.content)['states'])
         except (httpx.ReadTimeout):
             _LOGGER.error("Failed to set scene state due to timeout")
+        except (httpx.HTTPError, HaloException) as err:
+            _LOGGER.error("Failed to set scene state: %s", err)
 
     async def async_get_group_state(self, pid):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(self.API_GROUP_STATE.format(pid=pid),
-                        headers=headers,
-                        timeout=API_TIMEOUT)
-                return r.json()['state']
-        except (httpx.ReadTimeout):
-            _LOGGER.error("Failed to get group state due to timeout")
+        async def fetch():
+            try:
+                r = await self._async_request('GET', self._url(self.API_GROUP_STATE, pid))
+                return _index_states(orjson.loads(r.content)['state'])
+            except (httpx.ReadTimeout):
+                _LOGGER.error("Failed to get group state due to timeout")
+            except (httpx.HTTPError, HaloException) as err:
+                _LOGGER.error("Failed to get group state: %s", err)
+
+        return await self._async_get_cached(('group', pid), fetch)
 
     async def async_get_scene_state(self, pid, location_id):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(self.API_SCENES.format(location=location_id),
-                        headers=headers,
-                        timeout=API_TIMEOUT)
-                return [scene for scene in r.json()['scenes'] if scene['pid'] == pid][0]['properties']
-        except (httpx.ReadTimeout):
-            _LOGGER.error("Failed to get scene state due to timeout")
+        async def fetch():
+            try:
+                r = await self._async_request('GET', self._url(self.API_SCENES, location_id))
+                return {scene['pid']: _index_states(scene['properties'])
+                        for scene in orjson.loads(r.content)['scenes']}
+            except (httpx.ReadTimeout):
+                _LOGGER.error("Failed to get scene state due to timeout")
+            except (httpx.HTTPError, HaloException) as err:
+                _LOGGER.error("Failed to get scene state: %s", err)
+
+        # One fetch of the location's scene list serves every scene in it for the TTL.
+        scenes = await self._async_get_cached(('scenes', location_id), fetch)
+        if scenes is None or pid not in scenes:
+            return None
+        return scenes[pid]
 
 
     async def async_get_device_state(self, pid):
-        headers = {'Authorization': 'Token {}'.format(self._auth_token)}
-        try:
-            async with httpx.AsyncClient() as client:
-                r = await client.get(self.API_DEVICE_STATE.format(pid=pid),
-                        headers=headers,
-                        timeout=API_TIMEOUT)
-                return r.json()['state']
-        except (httpx.ReadTimeout):
-            _LOGGER.error("Failed to get device state due to timeout")
+        async def fetch():
+            try:
+                r = await self._async_request('GET', self._url(self.API_DEVICE_STATE, pid))
+                return _index_states(orjson.loads(r.content)['state'])
+            except (httpx.ReadTimeout):
+                _LOGGER.error("Failed to get device state due to timeout")
+            except (httpx.HTTPError, HaloException) as err:
+                _LOGGER.error("Failed to get device state: %s", err)
+
+        return await self._async_get_cached(('device', pid), fetch)
+
+    async def async_close(self):
+        """Close the shared HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import logging
-import importlib
 
 from homeassistant.components.light import (
     ATTR_BRIGHTNESS,
@@ -17,8 +16,8 @@ from homeassistant.util.color import color_temperature_mired_to_kelvin, color_te
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import DiscoveryInfoType
 from homeassistant.config_entries import ConfigEntry
-from .halo import *
-from .const import DOMAIN, PLATFORMS
+from .halo import HaloDevice
+from .const import DATA_LIGHTS, DOMAIN, PLATFORMS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,22 +28,12 @@ async def async_setup_entry(
     discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
     """Set up an Halo switch."""
-    api = hass.data[DOMAIN]
-
-    lights = []
-    locations = await hass.async_add_executor_job(api.get_locations)
-    for location in locations:
-        devices = await hass.async_add_executor_job(api.get_devices, location['pid'])
-        for device in devices:
-            lights.append(HaloLight(device))
-        groups = await hass.async_add_executor_job(api.get_groups, location['pid'])
-        for group in groups:
-            lights.append(HaloLight(group))
-    add_entities(lights, True)
+    devices = hass.data[DOMAIN][DATA_LIGHTS]
+    add_entities([HaloLight(device) for device in devices], True)
 
 
 class HaloLight(LightEntity):
-    def __init__(self, device):
+    def __init__(self, device: HaloDevice):
         """Initialize the light."""
         self._device = device
         self._unique_id = device.pid
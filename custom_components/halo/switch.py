@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import logging
-import importlib
 
 from homeassistant.components.switch import (
     SwitchEntity,
@@ -11,8 +10,8 @@ from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import DiscoveryInfoType
-from .halo import *
-from .const import DOMAIN, PLATFORMS
+from .halo import HaloScene
+from .const import DATA_SCENES, DOMAIN, PLATFORMS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,19 +22,12 @@ async def async_setup_entry(
     discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
     """Set up an Halo switch."""
-    api = hass.data[DOMAIN]
-
-    switches = []
-    locations = await hass.async_add_executor_job(api.get_locations)
-    for location in locations:
-        scenes = await hass.async_add_executor_job(api.get_scenes, location['pid'])
-        for scene in scenes:
-            switches.append(HaloSwitch(scene))
-    add_entities(switches, True)
+    scenes = hass.data[DOMAIN][DATA_SCENES]
+    add_entities([HaloSwitch(scene) for scene in scenes], True)
 
 
 class HaloSwitch(SwitchEntity):
-    def __init__(self, device):
+    def __init__(self, device: HaloScene):
         """Initialize the switch."""
         self._device = device
         self._unique_id = device.pid